@@ -1,9 +1,37 @@
+import argparse
 from pathlib import Path
 from rich.panel import Panel
 from modules.config import console
 from modules.processor import process_all_folders
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Adiciona legendas e logo permanentemente aos seus vídeos"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Número de pastas processadas em paralelo (padrão: metade dos núcleos)",
+    )
+    parser.add_argument(
+        "--quality",
+        choices=("fast", "balanced", "best"),
+        default="fast",
+        help="Troca velocidade por tamanho do arquivo na codificação em software",
+    )
+    parser.add_argument(
+        "--cpu",
+        action="store_true",
+        help="Força a codificação em software (libx264) mesmo com encoder de hardware disponível",
+    )
+    parser.add_argument(
+        "--skip-logo-when-unchanged",
+        action="store_true",
+        help="Sem legenda e com vídeo já em H.264, apenas remuxa (stream copy) sem aplicar a logo",
+    )
+    args = parser.parse_args()
+
     script_dir = Path(__file__).parent
     base_folder = script_dir / "input"
     output_base = script_dir / "output"
@@ -16,4 +44,8 @@ if __name__ == "__main__":
         )
     )
 
-    process_all_folders(base_folder, output_base)
\ No newline at end of file
+    process_all_folders(
+        base_folder, output_base,
+        jobs=args.jobs, use_cpu=args.cpu, quality=args.quality,
+        skip_logo_if_unchanged=args.skip_logo_when_unchanged,
+    )
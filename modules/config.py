@@ -3,5 +3,7 @@ from pathlib import Path
 
 # Configurações globais
 console = Console()
-VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi")
-SUBTITLE_EXTENSIONS = (".srt", ".ass", ".ssa")
\ No newline at end of file
+
+# Frozensets: teste O(1) de extensão nas varreduras de pasta
+VIDEO_EXTENSIONS = frozenset({".mp4", ".mkv", ".avi"})
+SUBTITLE_EXTENSIONS = frozenset({".srt", ".ass", ".ssa"})
\ No newline at end of file
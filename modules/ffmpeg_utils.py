@@ -1,57 +1,373 @@
-def create_ffmpeg_command(video_file, subtitle_file, logo_file, output_path, video_options, audio_options):
+import functools
+import json
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+from .config import console
+
+# Encoders H.264 de hardware aceitos, em ordem de preferência.
+# h264_vaapi fica de fora: exige frames em memória de GPU (hwupload) que a
+# cadeia de filtros atual, executada na CPU, não produz.
+_HW_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox")
+
+def _probe_encoder(encoder):
     """
-    Cria o comando FFmpeg unificado para processamento.
-    Nota: Esta função foi mantida, mas o processamento agora é feito
-    em duas etapas separadas diretamente na função burn_subtitle_and_logo
+    Codifica um único frame sintético com o encoder dado e descarta a saída.
+    Separa "compilado no binário" de "utilizável nesta máquina": um FFmpeg
+    com h264_nvenc compilado mas sem GPU NVIDIA lista o encoder e depois
+    falha na inicialização — o que só aconteceria no meio do lote.
     """
-    subtitle_filename = subtitle_file.name if subtitle_file else None
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", "nullsrc=s=640x360",
+                "-frames:v", "1",
+                "-pix_fmt", "yuv420p",
+                "-c:v", encoder,
+                "-f", "null", "-",
+            ],
+            capture_output=True,
+            timeout=15,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0
 
-    # Para processamento em uma única etapa (pode causar problemas de memória):
-    if subtitle_file:
+@functools.lru_cache(maxsize=1)
+def detect_hw_encoder():
+    """
+    Detecta o melhor encoder H.264 de hardware disponível no FFmpeg instalado.
+    Executa 'ffmpeg -encoders' uma única vez (memoizado), confirma cada
+    candidato com um encode de teste de um frame e retorna o nome do primeiro
+    que funciona de fato, ou 'libx264' quando nenhum hardware está disponível.
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except FileNotFoundError:
+        return "libx264"
+
+    for encoder in _HW_ENCODERS:
+        if encoder in result.stdout and _probe_encoder(encoder):
+            return encoder
+    return "libx264"
+
+@functools.lru_cache(maxsize=1)
+def detect_hw_decoder():
+    """
+    Verifica uma única vez (memoizado) se o FFmpeg instalado oferece algum
+    método de decodificação por hardware (ffmpeg -hwaccels).
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-hwaccels"],
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except FileNotFoundError:
+        return False
+
+    # A primeira linha é o cabeçalho "Hardware acceleration methods:"
+    methods = [line.strip() for line in result.stdout.splitlines()[1:] if line.strip()]
+    return bool(methods)
+
+# Opções globais comuns a todos os comandos de encode. O progresso sai pelo
+# canal -progress pipe:1, então o relatório humano do stderr fica desligado e
+# o loglevel cai para error: sem tempestades de warnings, o pipe do stderr
+# nunca enche (64KB cheios bloqueariam o encoder).
+# -filter_threads/-filter_complex_threads 0 deixam o FFmpeg escolher o máximo
+# de threads para o filtergraph em vez do padrão conservador.
+_GLOBAL_OPTS = [
+    "-hide_banner",
+    "-loglevel", "error",
+    "-progress", "pipe:1",
+    "-nostats",
+    "-filter_threads", "0",
+    "-filter_complex_threads", "0",
+]
+
+# Filtro de overlay da logo no canto superior direito. format=auto deixa o
+# overlay escolher o formato de pixel mais barato em vez de forçar yuv420.
+_OVERLAY_FILTER = "overlay=W-w:0:format=auto"
+
+# Opções de input que limitam o probing inicial do FFmpeg: para MP4/MKV bem
+# formados, sondar 5MB basta e corta centenas de ms entre o spawn e o
+# primeiro frame codificado.
+_INPUT_PROBE_OPTS = ["-probesize", "5M", "-analyzeduration", "0", "-fflags", "+fastseek+genpts"]
+
+def build_input_options():
+    """
+    Opções aplicadas antes do -i do vídeo: probing limitado e, com hardware
+    disponível, decodificação fora da CPU (-hwaccel auto), liberando núcleos
+    para os filtros e para o encoder mesmo quando o encode continua em software.
+    """
+    options = list(_INPUT_PROBE_OPTS)
+    if detect_hw_decoder():
+        options += ["-hwaccel", "auto"]
+    return options
+
+def build_logo_input(logo_file):
+    """
+    Monta os argumentos de input da logo. Se prewarm_logos gerou os sidecars
+    .bgra/.bgra.json, usa o rawvideo pré-decodificado (sem decode de PNG nem
+    conversão de formato no FFmpeg); senão, usa o PNG diretamente.
+    """
+    logo_file = Path(logo_file)
+    raw_path = logo_file.with_suffix(".bgra")
+    meta_path = logo_file.with_suffix(".bgra.json")
+
+    if raw_path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
         return [
-            "ffmpeg", # Comando base do FFmpeg
-            "-i", str(video_file), # Primeiro input: arquivo de vídeo
-            "-i", str(logo_file), # Segundo input: arquivo da logo
-            "-f", "mp4",  # Força o formato de saída para MP4
-            "-filter_complex", # Início da cadeia de filtros complexos
-            f"subtitles='{subtitle_filename}',overlay=W-w:0", # Filtros
-        ] + video_options + audio_options + [ # Filtros
-            "-y", # Sobrescrever arquivo se existir
-            str(output_path) # Caminho do arquivo de saída
+            "-f", "rawvideo",
+            "-pixel_format", "bgra",
+            "-video_size", f"{meta['width']}x{meta['height']}",
+            "-framerate", "1",
+            "-i", str(raw_path),
         ]
+
+    return ["-i", str(logo_file)]
+
+def escape_filter_path(path):
+    """
+    Escapa um caminho para uso dentro de uma string de filtro do FFmpeg.
+    O parser de filtros trata barra invertida, dois-pontos e aspas simples
+    como caracteres especiais (relevante em caminhos do Windows como C:\\...).
+    """
+    return str(path).replace("\\", "\\\\").replace(":", "\\:").replace("'", "\\'")
+
+def build_subtitle_filter(subtitle_file):
+    """
+    Monta o filtro de queima de legendas. Para .ass/.ssa usa o filtro 'ass='
+    diretamente, pulando a sondagem de formato e a conversão interna SRT->ASS
+    que o filtro 'subtitles=' faz antes de chamar a libass.
+
+    Usa o caminho absoluto escapado (filename=): o comando não depende do
+    diretório de trabalho do processo, o que permite rodar vários encodes
+    em paralelo sem os.chdir.
+    """
+    subtitle_file = Path(subtitle_file)
+    escaped_path = escape_filter_path(subtitle_file.resolve())
+    if subtitle_file.suffix.lower() in (".ass", ".ssa"):
+        return f"ass=filename='{escaped_path}'"
+    return f"subtitles=filename='{escaped_path}'"
+
+# Opções de muxing comuns a todos os encoders: +faststart move o MOOV para o
+# início (playback antes do download completo) e a fila de muxing maior evita
+# o aborto "Too many packets buffered" quando áudio copiado e vídeo codificado
+# avançam em ritmos muito diferentes.
+_MUX_OPTS = ["-movflags", "+faststart", "-max_muxing_queue_size", "9999"]
+
+# Mapeamento qualidade -> (preset, crf) do libx264. "fast" prioriza
+# throughput (veryfast rende ~1.5x sobre faster com perda pequena de
+# eficiência); "best" aceita encodes bem mais lentos por arquivos menores.
+_QUALITY_PRESETS = {
+    "fast": ("veryfast", "23"),
+    "balanced": ("medium", "21"),
+    "best": ("slow", "18"),
+}
+
+def _bitrate_cap_options(max_bitrate):
+    """
+    Opções de teto de bitrate (modo CRF limitado): -maxrate com -bufsize de
+    2x, o suficiente para o VBV segurar picos sem estrangular cenas difíceis.
+    Aceita valores como "5M" ou "800k"; valores malformados (ex.: "5Mbps")
+    geram um aviso único e desligam o teto em vez de derrubar cada worker
+    com um ValueError críptico.
+    """
+    digits = max_bitrate.rstrip("kKmM")
+    suffix = max_bitrate[len(digits):]
+    if not digits.isdigit() or len(suffix) > 1:
+        console.print(
+            f"[bold yellow]⚠️ Aviso:[/] LEGENDA_MAXRATE inválido ({max_bitrate!r}); "
+            "use um inteiro com sufixo opcional k/M (ex.: 5M, 800k). Teto ignorado."
+        )
+        return []
+    bufsize = f"{int(digits) * 2}{suffix}"
+    return ["-maxrate", max_bitrate, "-bufsize", bufsize]
+
+def build_video_options(encoder=None, quality="fast", threads=None, logo_only=False,
+                        max_bitrate=None):
+    """
+    Monta as opções de codificação de vídeo adequadas ao encoder escolhido.
+
+    As combinações de argumentos se repetem para todas as pastas de um lote,
+    então o resultado é memoizado e copiado para uma lista nova na saída —
+    sem reconstruir as opções a cada pasta.
+
+    Args:
+        encoder: Nome do encoder ("libx264", "h264_nvenc", ...). Quando None,
+                 usa o encoder de hardware detectado automaticamente.
+        quality: "fast", "balanced" ou "best" — controla preset/CRF do libx264
+        threads: Orçamento de threads deste job (núcleos/jobs). Limita o x264
+                 para que encodes paralelos não disputem os mesmos núcleos;
+                 encoders de hardware rodam na GPU e ficam com 1 thread de CPU.
+        logo_only: Entrada já em H.264 recebendo só a logo — o delta visual é
+                   um canto do frame, então o libx264 cai para
+                   ultrafast/fastdecode, trocando um pouco de bitrate por um
+                   encode várias vezes mais rápido.
+        max_bitrate: Teto opcional de bitrate (ex.: "5M") para saídas de
+                     tamanho previsível; também ajustável via LEGENDA_MAXRATE.
+    """
+    if max_bitrate is None:
+        max_bitrate = os.environ.get("LEGENDA_MAXRATE")
+    return list(_video_options_cached(encoder, quality, threads, logo_only, max_bitrate))
+
+@functools.lru_cache(maxsize=16)
+def _video_options_cached(encoder, quality, threads, logo_only, max_bitrate):
+    if encoder is None:
+        encoder = detect_hw_encoder()
+
+    if encoder != "libx264":
+        thread_options = ["-threads", "1"] if threads else []
     else:
-        return [
-            "ffmpeg",
-            "-i", str(video_file),
-            "-i", str(logo_file),
-            "-filter_complex", "overlay=W-w:0", # Apenas o filtro da logo
-        ] + video_options + audio_options + [ # Apenas o filtro da logo
-            "-y", str(output_path)
-        ]
+        if threads:
+            lookahead_threads = max(1, threads // 4)
+            thread_options = [
+                "-threads", str(threads),
+                "-x264-params",
+                f"threads={threads}:lookahead_threads={lookahead_threads}:sliced-threads=0",
+            ]
+        else:
+            # Sem orçamento (modo serial): pede explicitamente todas as
+            # threads em vez de depender da heurística padrão do FFmpeg
+            thread_options = ["-threads", "0"]
 
-def create_subtitle_command(video_file, subtitle_file, output_path, video_options, audio_options):
+    if encoder == "h264_nvenc":
+        return thread_options + [
+            "-c:v", "h264_nvenc",
+            "-preset", "p5",
+            "-tune", "hq",
+            "-rc", "vbr",
+            "-cq", "23",
+            "-b:v", "0",
+            "-profile:v", "high",
+        ] + _MUX_OPTS
+    if encoder == "h264_qsv":
+        return thread_options + [
+            "-c:v", "h264_qsv",
+            "-preset", "medium",
+            "-global_quality", "23",
+        ] + _MUX_OPTS
+    if encoder == "h264_videotoolbox":
+        return thread_options + [
+            "-c:v", "h264_videotoolbox",
+            "-q:v", "55",
+            "-profile:v", "high",
+        ] + _MUX_OPTS
+
+    # Fallback em software. LEGENDA_PRESET/LEGENDA_CRF permitem ajustar a
+    # troca velocidade/tamanho sem mexer no código
+    if logo_only:
+        preset, crf, tune = "ultrafast", "23", "fastdecode"
+    else:
+        preset, crf = _QUALITY_PRESETS.get(quality, _QUALITY_PRESETS["fast"])
+        tune = "film"
+    preset = os.environ.get("LEGENDA_PRESET", preset)
+    crf = os.environ.get("LEGENDA_CRF", crf)
+    rate_options = _bitrate_cap_options(max_bitrate) if max_bitrate else []
+    return thread_options + [
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", crf,
+        "-tune", tune,
+        "-profile:v", "high",
+    ] + rate_options + _MUX_OPTS
+
+def create_ffmpeg_command(video_file, subtitle_file, logo_file, output_path, video_options, audio_options):
     """
-    Cria o comando FFmpeg para adicionar apenas legendas ao vídeo.
+    Cria o comando FFmpeg unificado: legendas (quando houver) e logo são
+    aplicadas em uma única passada de decodificação/codificação, em vez do
+    antigo fluxo em duas etapas com arquivo intermediário.
+
+    O filtergraph vai em um arquivo temporário via -filter_complex_script:
+    caminhos de legenda longos não esbarram no limite de tamanho do argv e
+    o conteúdo escapa do quoting da linha de comando.
+
+    Returns:
+        Tupla (command, graph_path). O chamador deve remover graph_path
+        depois que o processo terminar.
     """
-    subtitle_filename = subtitle_file.name if subtitle_file else None
+    if subtitle_file:
+        filter_graph = f"{build_subtitle_filter(subtitle_file)},{_OVERLAY_FILTER}[vout]"
+    else:
+        filter_graph = f"{_OVERLAY_FILTER}[vout]"
 
-    return [
+    graph_fd, graph_path = tempfile.mkstemp(suffix=".graph", text=True)
+    with os.fdopen(graph_fd, "w", encoding="utf-8") as graph_file:
+        graph_file.write(filter_graph)
+
+    # Mapeamento explícito: só o ramo filtrado e o áudio original entram na
+    # saída; -sn/-dn impedem o remux de trilhas de legenda/dados do MP4 e
+    # que a trilha da logo (input 2) vaze para o arquivo final
+    command = [
         "ffmpeg",
+    ] + _GLOBAL_OPTS + build_input_options() + [
         "-i", str(video_file),
-        "-vf", f"subtitles='{subtitle_filename}'",
+    ] + build_logo_input(logo_file) + [
+        "-filter_complex_script", graph_path,
+        "-map", "[vout]",
+        "-map", "0:a?",
+        "-sn", "-dn",
     ] + video_options + audio_options + [
         "-y", str(output_path)
     ]
+    return command, graph_path
 
-def create_logo_command(video_file, logo_file, output_path, video_options, audio_options):
+def write_concat_manifest(video_files, manifest_path):
     """
-    Cria o comando FFmpeg para adicionar apenas a logo ao vídeo.
+    Escreve o manifesto do demuxer concat (uma linha "file '...'" por vídeo).
     """
+    lines = []
+    for video_file in video_files:
+        # Escape de aspas simples conforme a sintaxe do demuxer concat
+        escaped = str(video_file).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+
+    manifest_path = Path(manifest_path)
+    manifest_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return manifest_path
+
+def create_concat_command(manifest_path, logo_file, segment_times, output_pattern,
+                          video_options, audio_options):
+    """
+    Cria um comando FFmpeg que processa um lote homogêneo de vídeos (mesma
+    resolução, apenas logo) em um único processo de longa duração.
+
+    O demuxer concat alimenta todos os vídeos em sequência e o muxer segment
+    corta a saída de volta em um arquivo por vídeo, pagando a inicialização
+    do FFmpeg e o warmup do encoder uma única vez para o lote inteiro.
+
+    Args:
+        manifest_path: Manifesto gerado por write_concat_manifest
+        logo_file: Logo compartilhada pelo lote
+        segment_times: Tempos acumulados (em segundos) onde cada vídeo termina
+        output_pattern: Padrão de saída do segment (ex.: saida_%03d.mp4)
+        video_options: Opções de codificação de vídeo compartilhadas
+        audio_options: Opções de áudio compartilhadas
+    """
+    times = ",".join(f"{t:.3f}" for t in segment_times)
     return [
         "ffmpeg",
-        "-i", str(video_file),
-        "-i", str(logo_file),
-        "-filter_complex", "overlay=W-w:0",
+        "-f", "concat",
+        "-safe", "0",
+        "-i", str(manifest_path),
+    ] + build_logo_input(logo_file) + [
+        "-filter_complex", _OVERLAY_FILTER,
+        # Keyframes forçados nas fronteiras para que o segment corte
+        # exatamente onde um vídeo termina e o próximo começa
+        "-force_key_frames", times,
     ] + video_options + audio_options + [
-        "-y", str(output_path)
-    ]
\ No newline at end of file
+        "-f", "segment",
+        "-segment_times", times,
+        "-reset_timestamps", "1",
+        "-y", str(output_pattern),
+    ]
@@ -1,30 +1,55 @@
+import json
+import os
 from pathlib import Path
 from rich.table import Table
 from .config import console, VIDEO_EXTENSIONS, SUBTITLE_EXTENSIONS
 
-def find_video_and_subtitle(folder):
+def scan_video_and_subtitle(folder):
     """
-    Encontra o arquivo de vídeo e legenda em uma pasta.
+    Varre a pasta com os.scandir e retorna (vídeo, legenda) sem imprimir
+    nada — usado também pela pré-busca de metadados, que roda em threads
+    onde saída no console não é bem-vinda.
     """
     video_file = None
     subtitle_file = None
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+
+            stem, ext = os.path.splitext(entry.name)
+            ext = ext.lower()
+            if ext in VIDEO_EXTENSIONS and not video_file:
+                video_file = Path(entry.path)
+            elif ext in SUBTITLE_EXTENSIONS and not subtitle_file:
+                # Ignora as cópias _utf8 geradas pela própria ferramenta:
+                # elas apontariam o manifesto para o mtime da cópia em vez
+                # do da legenda original
+                if not stem.endswith("_utf8"):
+                    subtitle_file = Path(entry.path)
+
+            if video_file and subtitle_file:
+                break
+
+    return video_file, subtitle_file
+
+def find_video_and_subtitle(folder):
+    """
+    Encontra o arquivo de vídeo e legenda em uma pasta e apresenta o
+    resultado em uma tabela.
+    """
     folder_path = Path(folder)
+    video_file, subtitle_file = scan_video_and_subtitle(folder_path)
 
+    # Monta a tabela só depois da varredura, fora do loop quente
     table = Table(title=f"\nArquivos em [cyan]{folder_path}[/]")
     table.add_column("Tipo", style="bold magenta")
     table.add_column("Arquivo", style="green")
-
-    for file in folder_path.iterdir():
-        file_lower = str(file).lower()
-        if file_lower.endswith(VIDEO_EXTENSIONS) and not video_file:
-            video_file = file
-            table.add_row("Vídeo", str(file))
-        elif file_lower.endswith(SUBTITLE_EXTENSIONS) and not subtitle_file:
-            subtitle_file = file
-            table.add_row("Legenda", str(file))
-
-        if video_file and subtitle_file:
-            break
+    if video_file:
+        table.add_row("Vídeo", str(video_file))
+    if subtitle_file:
+        table.add_row("Legenda", str(subtitle_file))
 
     console.print(table)
 
@@ -35,17 +60,98 @@ def find_video_and_subtitle(folder):
 
     return video_file, subtitle_file
 
-def should_process_video(video_path, output_folder):
+# Sufixos que as saídas já processadas podem ter (inclui o _completo.mp4
+# gerado atualmente por burn_subtitle_and_logo e os nomes antigos)
+_OUTPUT_SUFFIXES = ("_completo.mp4", "_legendado.mp4", "_logo.mp4")
+
+def should_process_video(video_path, output_folder, existing=None):
     """
     Verifica se o vídeo deve ser processado.
+
+    Args:
+        video_path: Caminho do vídeo de entrada
+        output_folder: Pasta de saída desta pasta de entrada
+        existing: Conjunto opcional com os caminhos relativos
+            ("pasta/arquivo.mp4") de todas as saídas já geradas; quando
+            fornecido, a checagem é feita em memória sem nenhum stat no
+            disco. Os caminhos são qualificados pela pasta para que vídeos
+            homônimos em pastas diferentes não colidam
     """
     if not video_path:
         return False, "Vídeo não encontrado"
 
-    possible_suffixes = ["_legendado.mp4", "_logo.mp4"]
-    for suffix in possible_suffixes:
-        output_path = output_folder / f"{video_path.stem}{suffix}"
-        if output_path.exists():
-            return False, f"Arquivo já processado: {output_path}"
+    for suffix in _OUTPUT_SUFFIXES:
+        output_name = f"{video_path.stem}{suffix}"
+        if existing is not None:
+            if f"{output_folder.name}/{output_name}" in existing:
+                return False, f"Arquivo já processado: {output_folder / output_name}"
+        elif (output_folder / output_name).exists():
+            return False, f"Arquivo já processado: {output_folder / output_name}"
+
+    return True, None
+
+# Manifesto por pasta de saída: registra a assinatura (mtime/tamanho) das
+# entradas usadas em cada saída. Em reexecuções, saídas cujas entradas não
+# mudaram são puladas sem hash de conteúdo nem nova chamada ao FFmpeg.
+_MANIFEST_NAME = ".manifest.json"
+
+def _mtime_ns(path):
+    """mtime em nanossegundos, ou None se o arquivo não existir."""
+    try:
+        return Path(path).stat().st_mtime_ns
+    except OSError:
+        return None
+
+def load_manifest(output_folder):
+    """Lê o manifesto da pasta de saída; ausência ou corrupção viram dict vazio."""
+    try:
+        return json.loads((Path(output_folder) / _MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def manifest_entry(video_file, subtitle_file=None, logo_file=None, st=None):
+    """
+    Monta a assinatura das entradas que produziram uma saída. O chamador
+    pode repassar um os.stat_result já obtido do vídeo para não repetir
+    o syscall.
+    """
+    if st is None:
+        st = Path(video_file).stat()
+    return {
+        "src": [st.st_mtime_ns, st.st_size],
+        "sub": _mtime_ns(subtitle_file) if subtitle_file else None,
+        "logo": [str(logo_file), _mtime_ns(logo_file)] if logo_file else None,
+    }
+
+def manifest_matches(output_folder, output_name, video_file, subtitle_file=None):
+    """
+    Verifica se a assinatura registrada para a saída ainda bate com as
+    entradas atuais. Sem entrada no manifesto (saídas de versões antigas),
+    assume que bate, preservando o comportamento de pular saídas existentes.
+    """
+    entry = load_manifest(output_folder).get(output_name)
+    if entry is None:
+        return True
+
+    st = Path(video_file).stat()
+    if entry.get("src") != [st.st_mtime_ns, st.st_size]:
+        return False
+
+    sub_mtime = _mtime_ns(subtitle_file) if subtitle_file else None
+    if entry.get("sub") != sub_mtime:
+        return False
+
+    logo = entry.get("logo")
+    if logo and _mtime_ns(logo[0]) != logo[1]:
+        return False
+
+    return True
 
-    return True, None
\ No newline at end of file
+def update_manifest(output_folder, output_name, entry):
+    """Atualiza o manifesto de forma atômica (arquivo temporário + os.replace)."""
+    manifest_path = Path(output_folder) / _MANIFEST_NAME
+    manifest = load_manifest(output_folder)
+    manifest[output_name] = entry
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp_path, manifest_path)
\ No newline at end of file
@@ -1,7 +1,10 @@
 # modules/processor.py
 import os
+import shlex
 import subprocess
-import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from rich.progress import (
     Progress,
@@ -14,63 +17,199 @@ from rich.progress import (
 from rich.panel import Panel
 
 from .config import console
-from .time_utils import parse_time
-from .video_analysis import get_video_metadata, get_appropriate_logo
-from .file_utils import find_video_and_subtitle, should_process_video
+from .video_analysis import (
+    get_video_metadata,
+    get_appropriate_logo,
+    validate_assets,
+    prewarm_logos,
+    load_probe_cache,
+    save_probe_cache,
+    prefetch_video_metadata,
+)
+from .file_utils import (
+    find_video_and_subtitle,
+    scan_video_and_subtitle,
+    should_process_video,
+    manifest_entry,
+    manifest_matches,
+    update_manifest,
+)
 from .subtitle_utils import convert_subtitle_to_utf8
-from .ffmpeg_utils import create_ffmpeg_command
+from .ffmpeg_utils import (
+    create_ffmpeg_command,
+    build_video_options,
+    write_concat_manifest,
+    create_concat_command,
+)
+
+# Opções de áudio compartilhadas por todos os encodes: cópia sem recodificar
+_AUDIO_OPTS = ["-c:a", "copy"]
+
+# Tamanho do buffer do pipe do FFmpeg (1MB reduz syscalls por linha)
+_PIPE_BUFSIZE = 1 << 20
+
+# Intervalo entre atualizações da barra (4Hz): o FFmpeg emite progresso com
+# frequência bem maior, mas renderizar o Rich a cada evento desperdiça CPU
+_PROGRESS_INTERVAL = 0.25
+
+# Kwargs extras dos Popen: criam o FFmpeg em sessão/grupo próprio para que o
+# SIGINT do terminal não o mate no meio da escrita (o encerramento ordenado
+# via _terminate_active_processes preserva o átomo MOOV do MP4). Nenhum
+# preexec_fn/shell é usado, preservando o caminho rápido posix_spawn do
+# subprocess no Linux.
+if os.name == "nt":
+    _POPEN_SESSION_KWARGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _POPEN_SESSION_KWARGS = {"start_new_session": True}
+
+def _pump_stderr(stream):
+    """
+    Drena o stderr do FFmpeg em uma thread dedicada. Com -loglevel error só
+    chegam linhas de erro, então tudo é repassado; drenar continuamente impede
+    que o pipe encha e bloqueie o encoder.
+    """
+    for line in iter(stream.readline, b""):
+        text = line.decode("utf-8", errors="replace").strip()
+        if text:
+            console.print(f"[yellow]⚠️ FFmpeg:[/] {text}")
+
+def _pump_progress(stream, current_seconds):
+    """
+    Lê o canal -progress pipe:1 em uma thread dedicada e publica a posição
+    atual (em segundos) no contêiner compartilhado. Só escreve o valor; quem
+    renderiza é o ticker em process_video.
+    """
+    for line in iter(stream.readline, b""):
+        # out_time_us é a chave sem ambiguidade; out_time_ms fica como
+        # fallback para builds antigos (apesar do nome, também microssegundos)
+        if line.startswith(b"out_time_us=") or line.startswith(b"out_time_ms="):
+            try:
+                current_seconds[0] = int(line[12:]) / 1e6
+            except ValueError:
+                continue
+
+# Processos FFmpeg em execução, indexados pelo nome da pasta.
+# Usado para encerrar os encodes de forma ordenada em caso de interrupção.
+_active_processes = {}
+_active_processes_lock = threading.Lock()
+
+def _register_process(key, process):
+    with _active_processes_lock:
+        _active_processes[key] = process
+
+def _unregister_process(key):
+    with _active_processes_lock:
+        _active_processes.pop(key, None)
+
+def _terminate_active_processes():
+    """Encerra todos os processos FFmpeg ainda em execução."""
+    with _active_processes_lock:
+        processes = list(_active_processes.values())
+        _active_processes.clear()
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
 
 def process_video(progress, task, process, total_duration, start_percent=0, end_percent=100):
     """
-    Processa a saída do FFmpeg e atualiza o progresso.
+    Acompanha o progresso do FFmpeg pelo canal -progress pipe:1 (key=value).
+    As atualizações são agrupadas em lotes para reduzir as rerenderizações
+    do Rich; o stderr é drenado em paralelo apenas para expor erros.
 
     Args:
         progress: Objeto Progress da rich
         task: ID da tarefa
-        process: Processo FFmpeg
+        process: Processo FFmpeg (iniciado com -progress pipe:1 -nostats)
         total_duration: Duração total do vídeo
         start_percent: Porcentagem inicial para esta etapa
         end_percent: Porcentagem final para esta etapa
     """
     range_size = end_percent - start_percent
 
-    while process.poll() is None:
-        line = process.stderr.readline()
-        if line:
-            if "Error" in line or "Invalid" in line:
-                console.print(f"[yellow]⚠️ FFmpeg:[/] {line.strip()}")
+    stderr_reader = threading.Thread(target=_pump_stderr, args=(process.stderr,), daemon=True)
+    stderr_reader.start()
 
-            time_match = re.search(r"time=(\d{2}:\d{2}):(\d{2}\.\d{2})", line)
-            if time_match:
-                current_time = parse_time(time_match.group(0))
-                progress_ratio = min(current_time / total_duration, 1.0)
-                current_percent = start_percent + (progress_ratio * range_size)
-                progress.update(task, completed=current_percent)
+    # Lista de um elemento como contêiner mutável compartilhado com o parser
+    current_seconds = [0.0]
+    stdout_reader = threading.Thread(
+        target=_pump_progress, args=(process.stdout, current_seconds), daemon=True
+    )
+    stdout_reader.start()
 
-    return process.returncode == 0
+    # Ticker a 4Hz: desacopla a renderização do Rich da cadência (bem maior)
+    # com que o FFmpeg emite eventos de progresso. Atualizações que não
+    # mudariam o percentual inteiro exibido são puladas por completo.
+    last_percent = -1
+    while process.poll() is None:
+        progress_ratio = min(current_seconds[0] / total_duration, 1.0)
+        completed = start_percent + progress_ratio * range_size
+        if int(completed) != last_percent:
+            last_percent = int(completed)
+            progress.update(task, completed=completed)
+        time.sleep(_PROGRESS_INTERVAL)
+
+    stdout_reader.join(timeout=1)
+    progress_ratio = min(current_seconds[0] / total_duration, 1.0)
+    progress.update(task, completed=start_percent + progress_ratio * range_size)
+
+    return process.wait() == 0
+
+def _create_progress():
+    """Cria o objeto Progress padrão usado durante o processamento."""
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}"),
+        BarColumn(complete_style="green", finished_style="green"),
+        TaskProgressColumn(),
+        TimeRemainingColumn(),
+        console=console,
+        # Teto de repintura alinhado ao ticker de 4Hz: o Rich não repinta
+        # mais rápido do que os dados de progresso chegam
+        refresh_per_second=4,
+    )
 
-def burn_subtitle_and_logo(input_folder, output_folder, assets_dir=None):
+def burn_subtitle_and_logo(input_folder, output_folder, assets_dir=None,
+                           progress=None, threads=None, use_cpu=False,
+                           quality="fast", skip_logo_if_unchanged=False,
+                           existing_outputs=None):
     """
-    Função principal otimizada para processar o vídeo em duas etapas separadas.
+    Função principal: queima legendas e logo no vídeo em uma única passada.
 
     Args:
         input_folder: Pasta contendo o vídeo e legenda
         output_folder: Pasta onde será salvo o vídeo processado
         assets_dir: Diretório opcional contendo as logos
+        progress: Objeto Progress compartilhado (criado internamente se None)
+        threads: Limite de threads passado ao FFmpeg (-threads), se definido
+        use_cpu: Força o encoder libx264 mesmo com hardware disponível
+        quality: "fast", "balanced" ou "best" — troca velocidade por tamanho
+        skip_logo_if_unchanged: Sem legenda e com vídeo já em H.264 compatível,
+            faz apenas remux com stream copy (sem logo) em vez de recodificar
+        existing_outputs: Conjunto com os caminhos relativos
+            ("pasta/arquivo.mp4") das saídas já geradas, calculado uma vez
+            pelo chamador para evitar stats por pasta
     """
     # Verificações iniciais
     video_file, subtitle_file = find_video_and_subtitle(input_folder)
-    should_process, message = should_process_video(video_file, Path(output_folder))
+    output_folder = Path(output_folder)
+    should_process, message = should_process_video(
+        video_file, output_folder, existing=existing_outputs
+    )
     if not should_process:
-        console.print(f"[yellow]⚠️ {message}")
-        return False
+        # Saída já existe: pula apenas se o manifesto confirmar que as
+        # entradas não mudaram desde que ela foi gerada
+        if not video_file or manifest_matches(
+            output_folder, f"{video_file.stem}_completo.mp4", video_file, subtitle_file
+        ):
+            console.print(f"[yellow]⚠️ {message}")
+            return False
+        console.print(
+            f"[yellow]♻️ Entradas alteradas desde o último processamento, refazendo:[/] {video_file.name}"
+        )
 
     # Configurar output
-    output_folder = Path(output_folder)
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    # Cria um arquivo intermediário para a etapa de legendas
-    temp_output_path = output_folder / f"{video_file.stem}_legendado_temp.mp4"
     final_output_path = output_folder / f"{video_file.stem}_completo.mp4"
 
     # Obter metadados do vídeo
@@ -82,7 +221,33 @@ def burn_subtitle_and_logo(input_folder, output_folder, assets_dir=None):
     width, height = metadata["resolution"]
     total_duration = metadata["duration"] or 100
 
-    # Processar legenda se existir
+    # Atalho opcional: sem legenda e com codec compatível, um remux com
+    # stream copy transforma minutos de recodificação em segundos de mux.
+    # A logo não é aplicada nesse caso — overlay exigiria decodificar tudo.
+    if (skip_logo_if_unchanged and not subtitle_file
+            and metadata.get("vcodec") == "h264"
+            and metadata.get("profile") in ("High", "Main")):
+        remux_command = [
+            "ffmpeg",
+            "-i", str(video_file),
+            "-c:v", "copy",
+            "-c:a", "copy",
+            "-movflags", "+faststart",
+            "-y", str(final_output_path),
+        ]
+        result = subprocess.run(remux_command, capture_output=True)
+        if result.returncode != 0:
+            console.print("[bold red]❌ Erro:[/] Falha no remux com stream copy")
+            return False
+        console.print(
+            f"[bold green]✓ Remux sem recodificação concluído (logo não aplicada):[/] {final_output_path}"
+        )
+        update_manifest(output_folder, final_output_path.name, manifest_entry(video_file))
+        return True
+
+    # Processar legenda se existir (guarda a original para o manifesto:
+    # é o mtime dela, não o da cópia _utf8, que indica entrada alterada)
+    original_subtitle = subtitle_file
     if subtitle_file:
         subtitle_file = convert_subtitle_to_utf8(subtitle_file)
         if not subtitle_file:
@@ -95,124 +260,228 @@ def burn_subtitle_and_logo(input_folder, output_folder, assets_dir=None):
         console.print(f"[bold red]❌ Erro ao obter logo:[/] {str(e)}")
         return False
 
-    # Configurações de codificação otimizadas
-    video_options = [
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "26",
-        "-tune", "film",
-        "-profile:v", "high",
-        "-movflags", "+faststart",
-    ]
+    # Configurações de codificação: hardware quando disponível, senão libx264.
+    # Só-logo sobre entrada já em H.264 no perfil "fast" usa o atalho
+    # ultrafast/fastdecode — o único delta visual é o canto da logo
+    logo_only = (
+        quality == "fast" and not subtitle_file and metadata.get("vcodec") == "h264"
+    )
+    video_options = build_video_options(
+        "libx264" if use_cpu else None, quality=quality, threads=threads,
+        logo_only=logo_only,
+    )
 
-    # Copia o áudio original sem recodificar
-    audio_options = [
-        "-c:a", "copy"
-    ]
+    folder_name = Path(input_folder).name
 
-    # Salvar o diretório atual
-    original_dir = os.getcwd()
+    # Usa o Progress compartilhado se fornecido (processamento paralelo),
+    # senão cria um próprio para o modo standalone
+    own_progress = progress is None
+    if own_progress:
+        progress = _create_progress()
 
+    graph_path = None
     try:
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[bold blue]{task.description}"),
-            BarColumn(complete_style="green", finished_style="green"),
-            TaskProgressColumn(),
-            TimeRemainingColumn(),
-            console=console,
-        ) as progress:
-            # Mudar para o diretório do vídeo/legenda antes de executar o FFmpeg
-            os.chdir(video_file.parent)
-
-            # ETAPA 1: Adicionar legendas
-            if subtitle_file:
-                task1 = progress.add_task(
-                    f"[cyan]Etapa 1/2: Adicionando legendas ao vídeo",
-                    total=100
-                )
-
-                subtitle_command = [
-                    "ffmpeg",
-                    "-i", str(video_file),
-                    "-vf", f"subtitles='{subtitle_file.name}'",
-                ] + video_options + audio_options + [
-                    "-y", str(temp_output_path)
-                ]
-
-                process1 = subprocess.Popen(
-                    subtitle_command,
-                    stderr=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    universal_newlines=True
-                )
-
-                if not process_video(progress, task1, process1, total_duration):
-                    console.print("[bold red]❌ Erro:[/] Falha ao adicionar legendas ao vídeo")
-                    return False
-
-                input_for_logo = temp_output_path
-            else:
-                input_for_logo = video_file
-
-            # ETAPA 2: Adicionar logo
-            task2 = progress.add_task(
-                f"[cyan]Etapa 2/2: Adicionando logo ao vídeo",
-                total=100
-            )
+        if own_progress:
+            progress.start()
+
+        # Uma única passada: legendas (se houver) e logo no mesmo filtergraph,
+        # sem arquivo intermediário nem segunda recodificação
+        if subtitle_file:
+            description = f"[cyan]{folder_name}: Adicionando legendas e logo"
+        else:
+            description = f"[cyan]{folder_name}: Adicionando logo"
+        task = progress.add_task(description, total=100)
+
+        command, graph_path = create_ffmpeg_command(
+            video_file, subtitle_file, logo_file, final_output_path,
+            video_options, _AUDIO_OPTS,
+        )
 
-            logo_command = [
-                "ffmpeg",
-                "-i", str(input_for_logo),
-                "-i", str(logo_file),
-                "-filter_complex", "overlay=W-w:0",
-            ] + video_options + audio_options + [
-                "-y", str(final_output_path)
-            ]
-
-            process2 = subprocess.Popen(
-                logo_command,
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                universal_newlines=True
-            )
+        # Diagnóstico opcional: imprime o comando pronto para colar no shell,
+        # sem realce de sintaxe (lexing por vídeo não é de graça)
+        if os.environ.get("LEGENDA_DEBUG"):
+            console.log(shlex.join(command))
+
+        process = subprocess.Popen(
+            command,
+            stderr=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=_PIPE_BUFSIZE,
+            **_POPEN_SESSION_KWARGS,
+        )
+        _register_process(folder_name, process)
 
-            if not process_video(progress, task2, process2, total_duration):
-                console.print("[bold red]❌ Erro:[/] Falha ao adicionar logo ao vídeo")
+        try:
+            if not process_video(progress, task, process, total_duration):
+                console.print("[bold red]❌ Erro:[/] Falha ao processar o vídeo com FFmpeg")
                 return False
+        finally:
+            _unregister_process(folder_name)
+
+        # Calcular e mostrar redução de tamanho (um stat por arquivo,
+        # reaproveitado pela assinatura do manifesto logo abaixo)
+        input_st = video_file.stat()
+        output_size = final_output_path.stat().st_size
+        reduction = ((input_st.st_size - output_size) / input_st.st_size) * 100
+
+        console.print(
+            f"[bold green]✓ Processamento concluído com sucesso:[/] {final_output_path}\n"
+            f"[bold blue]📊 Redução de tamanho:[/] {reduction:.1f}%"
+        )
+        update_manifest(
+            output_folder,
+            final_output_path.name,
+            manifest_entry(video_file, original_subtitle, logo_file, st=input_st),
+        )
+        return True
 
-            # Remover arquivo temporário se existir
-            if subtitle_file and temp_output_path.exists():
-                try:
-                    temp_output_path.unlink()
-                except:
-                    console.print("[yellow]⚠️ Não foi possível remover o arquivo temporário")
+    except Exception as e:
+        console.print(f"[bold red]❌ Erro ao processar o vídeo:[/] {str(e)}")
+        return False
+    finally:
+        if graph_path:
+            try:
+                os.unlink(graph_path)
+            except OSError:
+                pass
+        if own_progress:
+            progress.stop()
+
+def _prepare_folder(video_file, subtitle_file):
+    """
+    Etapa de preparação de uma pasta, executada em threads antes dos encodes:
+    aquece o cache de metadados e deixa a legenda já convertida para UTF-8.
+    Ambas as operações são idempotentes, então o encode correspondente só
+    reaproveita o resultado.
+    """
+    prefetch_video_metadata(video_file)
+    if subtitle_file:
+        try:
+            convert_subtitle_to_utf8(subtitle_file)
+        except Exception:
+            # Falhas reaparecem (e são reportadas) no encode da pasta
+            pass
+
+def _process_logo_only_batches(folders, output_base_path, existing_outputs,
+                               quality, use_cpu):
+    """
+    Processa em lote, via demuxer concat + muxer segment, os grupos de pastas
+    sem legenda cujos vídeos têm a mesma resolução: um único processo FFmpeg
+    paga a inicialização e o warmup do encoder para o grupo inteiro, e o
+    segment corta a saída de volta em um arquivo por vídeo.
+
+    Experimental (habilitado por LEGENDA_BATCH_CONCAT): o demuxer concat
+    exige parâmetros de stream compatíveis entre os vídeos do grupo; grupos
+    que falharem caem de volta no processamento por pasta.
 
-            # Calcular e mostrar redução de tamanho
-            input_size = os.path.getsize(video_file)
-            output_size = os.path.getsize(final_output_path)
-            reduction = ((input_size - output_size) / input_size) * 100
+    Returns:
+        Conjunto com os nomes das pastas já processadas pelo lote.
+    """
+    buckets = {}
+    for folder in folders:
+        video_file, subtitle_file = scan_video_and_subtitle(folder)
+        if not video_file or subtitle_file:
+            continue
+        if f"{folder.name}/{video_file.stem}_completo.mp4" in existing_outputs:
+            continue
+        metadata = get_video_metadata(video_file)
+        if not metadata["resolution"] or not metadata["duration"]:
+            continue
+        buckets.setdefault(metadata["resolution"], []).append(
+            (folder, video_file, metadata["duration"])
+        )
+
+    handled = set()
+    for resolution, items in buckets.items():
+        if len(items) < 2:
+            continue
+
+        height = resolution[1]
+        try:
+            logo_file = get_appropriate_logo(height)
+        except Exception as e:
+            console.print(f"[bold red]❌ Erro ao obter logo:[/] {str(e)}")
+            continue
+
+        console.print(
+            f"[bold cyan]📦 Lote concat:[/] {len(items)} vídeos em {resolution[0]}x{height}"
+        )
+
+        # Nomes temporários qualificados pela resolução completa: alturas
+        # iguais com larguras diferentes não podem compartilhar o padrão
+        batch_tag = f"{resolution[0]}x{height}"
+        manifest_path = output_base_path / f".concat_{batch_tag}.txt"
+        write_concat_manifest([v for _, v, _ in items], manifest_path)
+
+        # Fronteiras acumuladas entre os vídeos (o fim do último é implícito)
+        segment_times = []
+        elapsed = 0.0
+        for _, _, duration in items[:-1]:
+            elapsed += duration
+            segment_times.append(elapsed)
+
+        # Segmentos órfãos de execuções interrompidas seriam confundidos
+        # com os desta rodada pelo loop de renomeação abaixo
+        for stale in output_base_path.glob(f".batch_{batch_tag}_*.mp4"):
+            stale.unlink(missing_ok=True)
+
+        output_pattern = output_base_path / f".batch_{batch_tag}_%03d.mp4"
+        video_options = build_video_options(
+            "libx264" if use_cpu else None, quality=quality, logo_only=True
+        )
+        command = create_concat_command(
+            manifest_path, logo_file, segment_times, output_pattern,
+            video_options, _AUDIO_OPTS,
+        )
 
+        result = subprocess.run(command, capture_output=True)
+        manifest_path.unlink(missing_ok=True)
+        if result.returncode != 0:
             console.print(
-                f"[bold green]✓ Processamento concluído com sucesso:[/] {final_output_path}\n"
-                f"[bold blue]📊 Redução de tamanho:[/] {reduction:.1f}%"
+                "[yellow]⚠️ Lote concat falhou; as pastas seguem pelo caminho individual"
             )
-            return True
+            for partial in output_base_path.glob(f".batch_{batch_tag}_*.mp4"):
+                partial.unlink(missing_ok=True)
+            continue
+
+        for i, (folder, video_file, _) in enumerate(items):
+            segment_path = output_base_path / f".batch_{batch_tag}_{i:03d}.mp4"
+            if not segment_path.exists():
+                continue
+            output_folder = output_base_path / folder.name
+            output_folder.mkdir(parents=True, exist_ok=True)
+            final_output_path = output_folder / f"{video_file.stem}_completo.mp4"
+            os.replace(segment_path, final_output_path)
+            update_manifest(
+                output_folder, final_output_path.name,
+                manifest_entry(video_file, None, logo_file),
+            )
+            handled.add(folder.name)
+            console.print(f"[bold green]✓ Lote:[/] {final_output_path}")
 
-    except Exception as e:
-        console.print(f"[bold red]❌ Erro ao processar o vídeo:[/] {str(e)}")
-        return False
-    finally:
-        # Restaurar o diretório original
-        os.chdir(original_dir)
+        # O muxer segment pode gerar um segmento extra por arredondamento
+        # das fronteiras; nada além dos movidos acima deve sobrar
+        for leftover in output_base_path.glob(f".batch_{batch_tag}_*.mp4"):
+            leftover.unlink(missing_ok=True)
 
-def process_all_folders(base_folder, output_base):
+    return handled
+
+def process_all_folders(base_folder, output_base, jobs=None, use_cpu=False,
+                        quality="fast", skip_logo_if_unchanged=False):
     """
-    Processa todas as pastas dentro da pasta base.
+    Processa todas as pastas dentro da pasta base, em paralelo quando possível.
+
+    Cada pasta é um encode FFmpeg independente, então o ganho escala de forma
+    quase linear com o número de jobs até o limite de núcleos/memória.
 
     Args:
         base_folder: Pasta contendo as subpastas com vídeos
         output_base: Pasta base onde serão criadas as subpastas com os vídeos processados
+        jobs: Número de pastas processadas simultaneamente
+              (padrão: metade dos núcleos, para não sobrecarregar o sistema)
+        use_cpu: Força o encoder libx264 mesmo com hardware disponível
+        quality: "fast", "balanced" ou "best" — troca velocidade por tamanho
+        skip_logo_if_unchanged: Repassado a burn_subtitle_and_logo
     """
     base_path = Path(base_folder)
     output_base_path = Path(output_base)
@@ -222,26 +491,122 @@ def process_all_folders(base_folder, output_base):
         console.print("[yellow]⚠️ Nenhuma pasta encontrada para processar.")
         return
 
+    # Valida as logos uma única vez antes de iniciar o lote
+    try:
+        validate_assets()
+    except FileNotFoundError as e:
+        console.print(f"[bold red]❌ Erro:[/] {e}")
+        return
+
+    # Pré-decodifica as logos (no-op sem Pillow)
+    prewarm_logos()
+
+    # Metadados de execuções anteriores: reexecuções não pagam ffprobe
+    output_base_path.mkdir(parents=True, exist_ok=True)
+    load_probe_cache(output_base_path / ".probe_cache.json")
+
+    # Preparação paralela das pastas: sonda os metadados (spawns de ffprobe
+    # dominados por latência se escondem uns atrás dos outros) e já converte
+    # as legendas para UTF-8. Quando os encodes começam, get_video_metadata
+    # acerta o cache e convert_subtitle_to_utf8 só encontra o arquivo pronto.
+    to_prepare = [
+        pair for pair in (scan_video_and_subtitle(f) for f in folders) if pair[0]
+    ]
+    if to_prepare:
+        with ThreadPoolExecutor(max_workers=min(16, len(to_prepare))) as prefetcher:
+            list(prefetcher.map(lambda pair: _prepare_folder(*pair), to_prepare))
+        save_probe_cache()
+
+    if jobs is None:
+        env_jobs = os.environ.get("LEGENDA_PARALLEL")
+        if env_jobs and env_jobs.isdigit():
+            jobs = int(env_jobs)
+        else:
+            jobs = max(1, (os.cpu_count() or 2) // 2)
+    jobs = max(1, min(jobs, len(folders)))
+
+    # Limita as threads de cada FFmpeg para que os jobs não disputem os núcleos
+    threads_per_job = max(1, (os.cpu_count() or 2) // jobs)
+
+    # Uma única varredura da árvore de saída substitui os stats por pasta
+    # feitos em should_process_video. Os caminhos são relativos à base
+    # ("pasta/arquivo.mp4"): só o nome do arquivo colidiria entre pastas
+    # diferentes com vídeos homônimos (ex.: episode1.mkv em várias pastas)
+    existing_outputs = (
+        {p.relative_to(output_base_path).as_posix() for p in output_base_path.rglob("*.mp4")}
+        if output_base_path.exists()
+        else set()
+    )
+
+    # Lote concat experimental: grupos só-logo de mesma resolução em um
+    # único processo FFmpeg (ver _process_logo_only_batches)
+    if os.environ.get("LEGENDA_BATCH_CONCAT"):
+        handled = _process_logo_only_batches(
+            folders, output_base_path, existing_outputs, quality, use_cpu
+        )
+        if handled:
+            save_probe_cache()
+            folders = [f for f in folders if f.name not in handled]
+            if not folders:
+                console.print("\n[bold green]Processamento concluído")
+                return
+
     console.print(
         Panel.fit(
             f"[bold green]🎬 Encontradas {len(folders)} pastas para processar[/]\n"
             f"[bold blue]📁 Pasta base:[/] {base_path}\n"
-            f"[bold blue]📁 Pasta saída:[/] {output_base_path}",
+            f"[bold blue]📁 Pasta saída:[/] {output_base_path}\n"
+            f"[bold blue]⚙️ Jobs paralelos:[/] {jobs}",
             title="Resumo do Processamento",
             border_style="cyan",
         )
     )
 
+    executor = ThreadPoolExecutor(max_workers=jobs)
     try:
-        for i, folder_path in enumerate(folders, 1):
-            console.print(f"\n[bold cyan]Processando pasta {i}/{len(folders)}: {folder_path.name}")
-            output_folder = output_base_path / folder_path.name
-            burn_subtitle_and_logo(folder_path, output_folder)
+        with _create_progress() as progress:
+            futures = {
+                executor.submit(
+                    burn_subtitle_and_logo,
+                    folder_path,
+                    output_base_path / folder_path.name,
+                    progress=progress,
+                    threads=threads_per_job,
+                    use_cpu=use_cpu,
+                    quality=quality,
+                    skip_logo_if_unchanged=skip_logo_if_unchanged,
+                    existing_outputs=existing_outputs,
+                ): folder_path
+                for folder_path in folders
+            }
+
+            done = 0
+            for future in as_completed(futures):
+                folder_path = futures[future]
+                done += 1
+                try:
+                    future.result()
+                    console.print(
+                        f"[bold cyan]Pasta {done}/{len(folders)} finalizada: {folder_path.name}"
+                    )
+                except Exception as e:
+                    console.print(
+                        f"[bold red]❌ Erro na pasta {folder_path.name}:[/] {e}"
+                    )
+                # Persiste os metadados já sondados: interrupções mantêm
+                # o que foi coletado até aqui
+                save_probe_cache()
+
+        executor.shutdown()
 
     except KeyboardInterrupt:
         console.print("\n[bold red]⚠️ Processamento interrompido pelo usuário.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _terminate_active_processes()
     except Exception as e:
         console.print(f"[bold red]❌ Erro inesperado:[/] {e}")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _terminate_active_processes()
         raise
     finally:
         console.print("\n[bold green]Processamento concluído")
\ No newline at end of file
@@ -1,33 +1,97 @@
+import codecs
+
 from .config import console
 
-def convert_subtitle_to_utf8(subtitle_path):
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+# Amostra usada para detectar a codificação: legendas têm codificação uniforme,
+# então os primeiros 64KB bastam e evitam ler o arquivo inteiro várias vezes
+_SAMPLE_SIZE = 65536
+
+_FALLBACK_ENCODINGS = ['utf-8', 'iso-8859-1', 'windows-1252']
+
+# BOMs conhecidos -> codificação. UTF-32 antes de UTF-16: o BOM de
+# UTF-32-LE começa com os mesmos bytes do de UTF-16-LE
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+def _detect_encoding(sample, truncated):
     """
-    Verifica a codificação da legenda e converte para UTF-8 se necessário.
+    Detecta a codificação de uma amostra da legenda em uma única passada.
+    Um BOM nos primeiros bytes decide de imediato, sem nenhuma tentativa
+    de decodificação; senão usa charset_normalizer quando instalado, ou
+    tenta uma lista fixa de codificações comuns apenas sobre a amostra.
     """
-    encodings = ['utf-8', 'iso-8859-1', 'windows-1252', 'ansi']
-    utf8_path = subtitle_path.parent / f"{subtitle_path.stem}_utf8{subtitle_path.suffix}"
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
 
-    if utf8_path.exists():
-        return utf8_path
+    if charset_normalizer is not None:
+        best = charset_normalizer.from_bytes(sample).best()
+        return best.encoding if best else None
 
-    for encoding in encodings:
+    # Sem charset_normalizer: se a amostra foi truncada, descarta os últimos
+    # bytes para não cortar um caractere multibyte ao meio
+    if truncated:
+        sample = sample[:-4]
+
+    for encoding in _FALLBACK_ENCODINGS:
         try:
-            with open(subtitle_path, 'r', encoding=encoding) as f:
-                content = f.read()
-                if encoding == 'utf-8':
-                    return subtitle_path
-                break
+            sample.decode(encoding)
+            return encoding
         except UnicodeDecodeError:
             continue
-    else:
+    return None
+
+def convert_subtitle_to_utf8(subtitle_path):
+    """
+    Verifica a codificação da legenda e converte para UTF-8 se necessário.
+    """
+    utf8_path = subtitle_path.parent / f"{subtitle_path.stem}_utf8{subtitle_path.suffix}"
+
+    # Reaproveita a cópia só se ela não for mais antiga que a legenda
+    # original; senão o redo disparado pelo manifesto queimaria o texto velho
+    try:
+        if utf8_path.stat().st_mtime_ns >= subtitle_path.stat().st_mtime_ns:
+            return utf8_path
+    except OSError:
+        pass
+
+    with open(subtitle_path, 'rb') as f:
+        sample = f.read(_SAMPLE_SIZE)
+
+    encoding = _detect_encoding(sample, truncated=len(sample) == _SAMPLE_SIZE)
+    if encoding is None:
         console.print(f"[bold red]❌ Erro:[/] Não foi possível detectar a codificação da legenda")
         return None
 
+    if encoding.lower().replace('_', '-') in ('utf-8', 'ascii'):
+        return subtitle_path
+
+    # Transcodifica em blocos de 64KB com um decoder incremental: o pico de
+    # memória fica limitado ao bloco, em vez de ~2x o tamanho do arquivo
     try:
-        with open(utf8_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        with open(subtitle_path, 'rb') as src, open(utf8_path, 'w', encoding='utf-8') as dst:
+            first_chunk = True
+            while chunk := src.read(_SAMPLE_SIZE):
+                text = decoder.decode(chunk)
+                if first_chunk:
+                    # Remove o BOM, que confunde o filtro de legendas
+                    text = text.lstrip('\ufeff')
+                    first_chunk = False
+                dst.write(text)
+            dst.write(decoder.decode(b'', final=True))
         console.print(f"[bold green]✓ Legenda convertida para UTF-8:[/] {utf8_path}")
         return utf8_path
     except Exception as e:
         console.print(f"[bold red]❌ Erro ao converter legenda para UTF-8:[/] {str(e)}")
-        return None
\ No newline at end of file
+        return None
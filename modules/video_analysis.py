@@ -1,82 +1,211 @@
 # modules/video_analysis.py
+import functools
+import json
+import os
 import subprocess
-import re
+import threading
 from pathlib import Path
 from .config import console
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Cache persistente de metadados entre execuções (.probe_cache.json na pasta
+# de saída). Chave: "caminho|mtime_ns|tamanho" -> JSON bruto do ffprobe.
+_probe_cache = {}
+_probe_cache_path = None
+_probe_cache_lock = threading.Lock()
+
+def load_probe_cache(cache_path):
+    """
+    Carrega o cache persistente de metadados, se existir. Em reexecuções,
+    vídeos inalterados não pagam nenhum spawn de ffprobe.
+    """
+    global _probe_cache_path, _probe_cache
+    _probe_cache_path = Path(cache_path)
+    try:
+        _probe_cache = json.loads(_probe_cache_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        _probe_cache = {}
+
+def save_probe_cache():
+    """
+    Grava o cache de forma atômica (arquivo temporário + os.replace), para
+    que execuções interrompidas preservem os resultados parciais.
+    """
+    if _probe_cache_path is None:
+        return
+    with _probe_cache_lock:
+        snapshot = dict(_probe_cache)
+    tmp_path = _probe_cache_path.with_name(_probe_cache_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(snapshot), encoding="utf-8")
+    os.replace(tmp_path, _probe_cache_path)
+
+@functools.lru_cache(maxsize=256)
+def _probe_video(video_path_str, st_mtime_ns, st_size):
+    """
+    Executa o ffprobe uma única vez por vídeo e retorna o JSON parseado.
+    Memoizado com mtime/tamanho na chave, para que chamadas repetidas
+    (ex.: retries) reaproveitem o resultado sem risco de ler dados velhos
+    se o arquivo for substituído durante o lote. Consulta e alimenta também
+    o cache persistente entre execuções.
+    """
+    cache_key = f"{video_path_str}|{st_mtime_ns}|{st_size}"
+    with _probe_cache_lock:
+        cached = _probe_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,codec_name,profile:format=duration",
+            "-of", "json",
+            video_path_str,
+        ],
+        capture_output=True,
+        encoding="utf-8",
+        errors="replace",
+        check=True,
+    )
+    data = json.loads(result.stdout)
+
+    with _probe_cache_lock:
+        _probe_cache[cache_key] = data
+    return data
+
+def prefetch_video_metadata(video_path):
+    """
+    Aquecimento silencioso do cache de metadados, pensado para rodar em
+    threads no início do lote: sonda o vídeo e descarta falhas — quem
+    reporta erros é o get_video_metadata do encode correspondente.
+    """
+    try:
+        st = Path(video_path).stat()
+        _probe_video(str(video_path), st.st_mtime_ns, st.st_size)
+    except Exception:
+        pass
+
 def get_video_metadata(video_path):
     """
-    Obtém todos os metadados relevantes do vídeo em uma única chamada FFmpeg.
-    Usa codificação utf-8 com tratamento de erros para lidar com caracteres especiais.
-    """
-    with console.status("[bold yellow]Analisando metadados do vídeo...", spinner="dots"):
-        cmd = ["ffmpeg", "-i", str(video_path)]
-        try:
-            # Configurar o processo para usar utf-8 e ignorar erros de codificação
-            process = subprocess.Popen(
-                cmd,
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                universal_newlines=False  # Mudamos para False para obter bytes brutos
-            )
+    Obtém todos os metadados relevantes do vídeo em uma única chamada ffprobe.
+    A saída JSON estruturada evita o parsing frágil do stderr do FFmpeg.
+    Sem spinner: esta função roda dentro dos workers enquanto a barra de
+    progresso compartilhada está ativa, e dois displays "live" do Rich ao
+    mesmo tempo disparam LiveError. Com a pré-busca aquecendo o cache, a
+    consulta aqui é praticamente instantânea de qualquer forma.
+    """
+    try:
+        st = Path(video_path).stat()
+        data = _probe_video(str(video_path), st.st_mtime_ns, st.st_size)
+
+        streams = data.get("streams") or []
+        stream = streams[0] if streams else {}
+        width = stream.get("width")
+        height = stream.get("height")
 
-            # Capturar a saída e decodificar com tratamento de erros
-            _, stderr_bytes = process.communicate()
-            stderr = stderr_bytes.decode('utf-8', errors='replace')
+        duration_str = data.get("format", {}).get("duration")
+        duration = float(duration_str) if duration_str else None
 
-            # Extrair resolução
-            resolution_match = re.search(r"Stream.*Video:.* (\d+)x(\d+)", stderr)
-            width = height = None
-            if resolution_match:
-                width = int(resolution_match.group(1))
-                height = int(resolution_match.group(2))
+        if not (width and height) and not duration:
+            console.print("[bold yellow]⚠️ Aviso:[/] Não foi possível extrair todos os metadados do vídeo")
 
-            # Extrair duração
-            duration_match = re.search(
-                r"Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})", stderr
+        return {
+            "resolution": (int(width), int(height)) if width and height else None,
+            "duration": duration,
+            "vcodec": stream.get("codec_name"),
+            "profile": stream.get("profile"),
+        }
+
+    except FileNotFoundError:
+        console.print("[bold red]Erro:[/] FFprobe não encontrado no sistema")
+        raise
+    except Exception as e:
+        console.print(f"[bold red]Erro ao obter metadados do vídeo:[/] {str(e)}")
+        console.print("[bold yellow]Detalhes adicionais:[/] Verifique se o arquivo de vídeo está corrompido ou se tem caracteres especiais no nome")
+        raise RuntimeError(f"Erro ao processar vídeo: {str(e)}")
+
+# Constantes calculadas uma única vez no import: o diretório de assets e os
+# caminhos das logos são estáticos, não há razão para reconstruí-los por pasta
+_ASSETS_DIR = Path(__file__).resolve().parent.parent / "assets"
+_LOGO_HEIGHTS = (720, 1080)
+_LOGOS = {height: _ASSETS_DIR / f"{height} overlay.png" for height in _LOGO_HEIGHTS}
+
+def prewarm_logos():
+    """
+    Pré-decodifica as logos PNG uma única vez para rawvideo BGRA em arquivos
+    .bgra ao lado dos originais, com as dimensões em um sidecar .json.
+    As dimensões originais são preservadas: os overlays cobrem o frame
+    inteiro, então qualquer redimensionamento aqui corromperia a saída.
+    Com os sidecars presentes, o FFmpeg lê os pixels prontos em vez de pagar
+    o inflate/CRC da libpng a cada processo. Requer Pillow; sem ele, os PNGs
+    continuam sendo usados diretamente.
+    """
+    if Image is None:
+        return
+
+    for logo_path in _LOGOS.values():
+        raw_path = logo_path.with_suffix(".bgra")
+        meta_path = logo_path.with_suffix(".bgra.json")
+
+        with Image.open(logo_path) as img:
+            # Sidecar atual só vale se for mais novo que o PNG e tiver as
+            # mesmas dimensões (regenera sidecars redimensionados por
+            # versões antigas do prewarm)
+            if (raw_path.exists() and meta_path.exists()
+                    and raw_path.stat().st_mtime >= logo_path.stat().st_mtime):
+                try:
+                    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                except (json.JSONDecodeError, OSError):
+                    meta = {}
+                if (meta.get("width"), meta.get("height")) == img.size:
+                    continue
+
+            rgba = img.convert("RGBA")
+            raw_path.write_bytes(rgba.tobytes("raw", "BGRA"))
+            meta_path.write_text(
+                json.dumps({"width": rgba.width, "height": rgba.height}),
+                encoding="utf-8",
             )
-            duration = None
-            if duration_match:
-                hours = int(duration_match.group(1))
-                minutes = int(duration_match.group(2))
-                seconds = int(duration_match.group(3))
-                duration = hours * 3600 + minutes * 60 + seconds
-
-            if not resolution_match and not duration_match:
-                console.print("[bold yellow]⚠️ Aviso:[/] Não foi possível extrair todos os metadados do vídeo")
-                console.print(f"[bold blue]ℹ️ Saída do FFmpeg:[/] {stderr}")
-
-            return {
-                "resolution": (width, height) if width and height else None,
-                "duration": duration
-            }
-
-        except FileNotFoundError:
-            console.print("[bold red]Erro:[/] FFmpeg não encontrado no sistema")
-            raise
-        except Exception as e:
-            console.print(f"[bold red]Erro ao obter metadados do vídeo:[/] {str(e)}")
-            console.print("[bold yellow]Detalhes adicionais:[/] Verifique se o arquivo de vídeo está corrompido ou se tem caracteres especiais no nome")
-            raise RuntimeError(f"Erro ao processar vídeo: {str(e)}")
 
-def get_appropriate_logo(height, assets_dir=None):
+def validate_assets(assets_dir=None):
     """
-    Determina qual versão da logo usar baseado na altura do vídeo.
+    Valida uma única vez que o diretório de assets e as logos existem.
+    Chamado no início do lote para falhar cedo, evitando repetir os
+    stats de existência a cada pasta processada.
     """
     if assets_dir is None:
-        assets_dir = Path(__file__).parent.parent / "assets"
+        assets_dir = _ASSETS_DIR
 
     if not assets_dir.exists():
         raise FileNotFoundError(f"Diretório de assets não encontrado: {assets_dir}")
 
-    logos = {
-        720: assets_dir / "720 overlay.png",
-        1080: assets_dir / "1080 overlay.png"
-    }
-
-    for resolution, logo_path in logos.items():
+    for height in _LOGO_HEIGHTS:
+        logo_path = assets_dir / f"{height} overlay.png"
         if not logo_path.exists():
             raise FileNotFoundError(f"Arquivo de logo não encontrado: {logo_path}")
 
-    closest_resolution = min(logos.keys(), key=lambda x: abs(x - height))
-    return logos[closest_resolution]
\ No newline at end of file
+@functools.lru_cache(maxsize=32)
+def get_appropriate_logo(height, assets_dir=None):
+    """
+    Determina qual versão da logo usar baseado na altura do vídeo.
+    Memoizado: as logos são estáticas durante o lote, então cada altura
+    só paga o stat de existência na primeira chamada. O parâmetro
+    assets_dir existe para permitir override em testes.
+    """
+    # Comparação direta em vez de min(key=lambda): só existem duas alturas
+    closest_height = 720 if abs(height - 720) <= abs(height - 1080) else 1080
+
+    if assets_dir is None:
+        logo_path = _LOGOS[closest_height]
+    else:
+        logo_path = assets_dir / f"{closest_height} overlay.png"
+
+    if not logo_path.exists():
+        raise FileNotFoundError(f"Arquivo de logo não encontrado: {logo_path}")
+
+    return logo_path
\ No newline at end of file